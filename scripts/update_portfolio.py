@@ -12,11 +12,16 @@ Run manually:   python scripts/update_portfolio.py
 Run via CI:     GitHub Actions runs this on a daily cron schedule
 """
 
+import hashlib
 import json
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+import bottleneck as bn
 import numpy as np
+import orjson
 import pandas as pd
 import yfinance as yf
 
@@ -27,6 +32,10 @@ STARTING_CAPITAL = 15_000_000  # JPY
 RISK_FREE_RATE = 0.05          # annualized, for Sharpe calculation
 USD_JPY_TICKER = "JPY=X"       # USD/JPY exchange rate
 
+# Company name fields, in order of preference. Both are present in Yahoo's
+# chart metadata, so a name lookup doesn't need the full .info payload.
+NAME_FIELDS = ("shortName", "longName")
+
 BENCHMARKS = {
     "Nikkei 225": "^N225",
     "S&P 500": "^GSPC",
@@ -49,16 +58,30 @@ SECTOR_MAP = {
 
 TRADES_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "trades.csv")
 OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "portfolio.json")
+NAMES_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "ticker_names.json")
+PRICES_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "prices.parquet")
+NAV_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "nav.parquet")
 
 
 # ── Data Loading ───────────────────────────────────────────────
 
 def load_trades(path: str) -> pd.DataFrame:
     """Load and validate the trades CSV."""
-    df = pd.read_csv(path, parse_dates=["date"])
+    required_cols = {"date", "ticker", "action", "shares", "price", "currency"}
+    df = pd.read_csv(
+        path,
+        parse_dates=["date"],
+        usecols=lambda col: col in required_cols,
+        dtype={
+            "ticker": "category",
+            "action": "category",
+            "currency": "category",
+            "shares": "int64",
+            "price": "float64",
+        },
+    )
     df = df.sort_values("date").reset_index(drop=True)
 
-    required_cols = {"date", "ticker", "action", "shares", "price", "currency"}
     if not required_cols.issubset(df.columns):
         missing = required_cols - set(df.columns)
         raise ValueError(f"trades.csv is missing columns: {missing}")
@@ -67,7 +90,7 @@ def load_trades(path: str) -> pd.DataFrame:
 
 
 def get_fx_rate() -> float:
-    """Get current USD/JPY exchange rate."""
+    """Get current USD/JPY exchange rate when it isn't in the downloaded prices."""
     try:
         fx = yf.Ticker(USD_JPY_TICKER)
         rate = fx.fast_info.get("lastPrice", None)
@@ -83,215 +106,351 @@ def get_all_tickers(trades: pd.DataFrame) -> list:
     return trades["ticker"].unique().tolist()
 
 
-def fetch_prices(tickers: list, start_date: str) -> pd.DataFrame:
-    """Fetch historical daily close prices for all tickers with retry logic."""
-    all_tickers = tickers + list(BENCHMARKS.values()) + [USD_JPY_TICKER]
+def fetch_single_prices(ticker: str, start_date: str) -> pd.Series | None:
+    """Fetch daily close prices for one ticker, retrying once on failure."""
+    for attempt in range(2):
+        try:
+            history = yf.Ticker(ticker).history(start=start_date, auto_adjust=True)
+            if not history.empty:
+                close = history["Close"]
+                close.index = close.index.tz_localize(None)
+                return close
+        except Exception:
+            pass
+    return None
+
+
+def load_cached_prices(tickers: list, start_date: str, cache_path: str) -> pd.DataFrame | None:
+    """Load the on-disk price cache if it covers every ticker from start_date."""
+    if not os.path.exists(cache_path):
+        return None
+
+    cached = pd.read_parquet(cache_path)
+    cached = cached[cached.index >= pd.Timestamp(start_date)]
+
+    # Allow a week of slack for start dates on weekends or market holidays.
+    # A ticker with no quotes at all failed to download when the cache was
+    # written; incremental runs never refetch its history, so start over.
+    if (
+        cached.empty
+        or not set(tickers).issubset(cached.columns)
+        or not cached[tickers].notna().any().all()
+        or cached.index.min() > pd.Timestamp(start_date) + timedelta(days=7)
+    ):
+        return None
+    return cached
+
+
+def cache_matches_download(cached: pd.DataFrame, prices: pd.DataFrame, day) -> bool:
+    """
+    Check a settled day present in both the cache and a fresh download.
+    Adjusted closes are rescaled upstream after dividends and splits, which
+    shows up as a mismatch here.
+    """
+    if day not in prices.index:
+        return True
+    cols = cached.columns.intersection(prices.columns)
+    old = cached.loc[day, cols].to_numpy(dtype=np.float64)
+    new = prices.loc[day, cols].to_numpy(dtype=np.float64)
+    both = ~np.isnan(old) & ~np.isnan(new)
+    return np.allclose(old[both], new[both], rtol=1e-5)
 
-    prices = pd.DataFrame()
 
-    # Try bulk download first
+def download_closes(all_tickers: list, start_date: str) -> pd.DataFrame:
+    """Bulk-download daily closes for all tickers, retrying up to three times."""
     for attempt in range(3):
         try:
-            data = yf.download(all_tickers, start=start_date, auto_adjust=True, progress=False)
+            data = yf.download(all_tickers, start=start_date, auto_adjust=True, progress=False, threads=True)
             if isinstance(data.columns, pd.MultiIndex):
-                prices = data["Close"]
-            else:
-                prices = data[["Close"]]
-                prices.columns = all_tickers[:1]
-            break
+                return data["Close"]
+            prices = data[["Close"]]
+            prices.columns = all_tickers[:1]
+            return prices
         except Exception as e:
             print(f"  Bulk download attempt {attempt + 1} failed: {e}")
             if attempt == 2:
                 print("  Bulk download failed, trying individual tickers...")
+    return pd.DataFrame()
 
-    # Retry any tickers that are missing or empty
-    for ticker in all_tickers:
-        if ticker not in prices.columns or prices[ticker].dropna().empty:
-            print(f"  Retrying individual download for {ticker}...")
-            for attempt in range(2):
-                try:
-                    single = yf.download(ticker, start=start_date, auto_adjust=True, progress=False)
-                    if not single.empty:
-                        if isinstance(single.columns, pd.MultiIndex):
-                            prices[ticker] = single["Close"][ticker]
-                        else:
-                            prices[ticker] = single["Close"]
-                        print(f"  ✓ Got {ticker} on retry")
-                        break
-                except Exception:
-                    pass
-
-    prices = prices.ffill().bfill()
-    return prices
 
+def fetch_prices(tickers: list, start_date: str, cache_path: str = PRICES_CACHE_PATH) -> tuple[pd.DataFrame, bool]:
+    """
+    Fetch historical daily close prices for all tickers with retry logic.
+    Gaps are forward-filled once here, so downstream steps read the matrix as-is;
+    dates before a ticker's first quote stay NaN.
+    Also returns whether the full history was downloaded instead of extending
+    the cache, in which case anything derived from older prices is stale.
+    """
+    all_tickers = tickers + list(BENCHMARKS.values()) + [USD_JPY_TICKER]
 
-# ── Portfolio Construction ─────────────────────────────────────
+    # Only re-download the last two cached days onward when the cache is usable:
+    # the last may be a partial session, the one before is settled and is used
+    # to detect upstream rescaling of the cached history.
+    cached = load_cached_prices(all_tickers, start_date, cache_path)
+    fetch_start = start_date
+    if cached is not None:
+        check_day = cached.index[-2] if len(cached) > 1 else cached.index[-1]
+        fetch_start = check_day.strftime("%Y-%m-%d")
+        print(f"  Using cached prices through {cached.index[-1]:%Y-%m-%d}")
+
+    prices = download_closes(all_tickers, fetch_start)
+
+    if cached is not None and not cache_matches_download(cached, prices, check_day):
+        print("  Cached prices were rescaled upstream (dividend or split), re-downloading full history...")
+        cached = None
+        fetch_start = start_date
+        prices = download_closes(all_tickers, fetch_start)
+
+    # Retry any tickers that are missing or empty, concurrently. With a cache,
+    # an all-NaN column just means that market had no new sessions.
+    missing = [
+        t for t in all_tickers
+        if t not in prices.columns or (cached is None and prices[t].dropna().empty)
+    ]
+    retried = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = {}
+            for ticker in missing:
+                print(f"  Retrying individual download for {ticker}...")
+                futures[pool.submit(fetch_single_prices, ticker, fetch_start)] = ticker
+            for future in as_completed(futures):
+                retried[futures[future]] = future.result()
+
+    for ticker in missing:
+        if retried[ticker] is not None:
+            prices[ticker] = retried[ticker]
+            print(f"  ✓ Got {ticker} on retry")
+
+    if cached is not None:
+        prices = prices.combine_first(cached)
+
+    # float32 halves the price matrix; NAV and outputs are computed in float64
+    prices = prices.astype(np.float32)
+    prices.to_parquet(cache_path, compression="zstd")
+
+    # Drop tickers with no data at all rather than inventing prices for them
+    empty = prices.columns[prices.isna().all()]
+    for ticker in empty:
+        print(f"  Dropping {ticker}: no price data available")
+    prices = prices.drop(columns=empty)
+
+    # Carry the last quote over market holidays and halts. No backward fill: that
+    # would value positions before a ticker's first quote at a later price.
+    arr = bn.push(prices.to_numpy(copy=True), axis=0)
+    prices = pd.DataFrame(arr, index=prices.index, columns=prices.columns)
+    return prices, cached is None
+
+
+def fetch_company_name(ticker: str) -> str | None:
+    """Look up one company's short name from yfinance."""
+    yf_ticker = yf.Ticker(ticker)
+    # Each source can fail on its own; a metadata error still falls back to .info
+    for source in (yf_ticker.get_history_metadata, yf_ticker.get_info):
+        try:
+            meta = source()
+            name = next((meta[field] for field in NAME_FIELDS if meta.get(field)), None)
+            if name:
+                return name
+        except Exception:
+            pass
+    return None
 
-def build_positions(trades: pd.DataFrame) -> pd.DataFrame:
-    """Aggregate trades into current positions."""
-    positions = []
 
-    for ticker, group in trades.groupby("ticker"):
-        buys = group[group["action"] == "BUY"]
-        sells = group[group["action"] == "SELL"]
+def fetch_company_names(tickers: list, cache_path: str = NAMES_PATH) -> dict:
+    """Look up company names, fetching only tickers missing from the on-disk cache."""
+    names = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            names = json.load(f)
 
-        total_bought = buys["shares"].sum()
-        total_sold = sells["shares"].sum() if len(sells) > 0 else 0
-        current_shares = total_bought - total_sold
+    missing = [t for t in tickers if t not in names]
+    if missing:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            for ticker, name in zip(missing, pool.map(fetch_company_name, missing)):
+                if name:
+                    names[ticker] = name
 
-        if current_shares <= 0:
-            continue
+        with open(cache_path, "w") as f:
+            json.dump(names, f, indent=2, sort_keys=True)
 
-        # Weighted average cost
-        avg_cost = (buys["shares"] * buys["price"]).sum() / buys["shares"].sum()
-        currency = buys["currency"].iloc[0]
-        first_buy = buys["date"].min()
+    return names
 
-        positions.append({
-            "ticker": ticker,
-            "shares": current_shares,
-            "avg_cost": round(avg_cost, 2),
-            "currency": currency,
-            "sector": SECTOR_MAP.get(ticker, "Other"),
-            "first_buy": first_buy.strftime("%Y-%m-%d"),
-        })
 
-    return pd.DataFrame(positions)
+def get_last_prices(prices: pd.DataFrame) -> pd.Series:
+    """Latest available price per ticker, computed once for all downstream steps."""
+    if prices.empty:
+        return pd.Series(dtype=np.float64)
+    return prices.iloc[-1].astype(np.float64)
 
 
-def calculate_holdings(positions: pd.DataFrame, prices: pd.DataFrame, fx_rate: float) -> list:
+# ── Portfolio Construction ─────────────────────────────────────
+
+def build_positions(trades: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate trades into current positions."""
+    is_buy = trades["action"].eq("BUY")
+    flows = trades.assign(
+        signed_shares=np.select([is_buy, trades["action"].eq("SELL")], [trades["shares"], -trades["shares"]], 0),
+        buy_shares=trades["shares"].where(is_buy, 0),
+        buy_notional=(trades["shares"] * trades["price"]).where(is_buy, 0.0),
+        buy_currency=trades["currency"].where(is_buy),
+        buy_date=trades["date"].where(is_buy),
+    )
+
+    agg = flows.groupby("ticker", observed=True).agg(
+        shares=("signed_shares", "sum"),
+        buy_shares=("buy_shares", "sum"),
+        buy_notional=("buy_notional", "sum"),
+        currency=("buy_currency", "first"),
+        first_buy=("buy_date", "min"),
+    )
+    positions = agg[agg["shares"] > 0].reset_index()
+
+    # Weighted average cost
+    positions["avg_cost"] = (positions["buy_notional"] / positions["buy_shares"]).round(2)
+    positions["sector"] = positions["ticker"].map(SECTOR_MAP).fillna("Other")
+    positions["first_buy"] = positions["first_buy"].dt.strftime("%Y-%m-%d")
+
+    return positions[["ticker", "shares", "avg_cost", "currency", "sector", "first_buy"]]
+
+
+def calculate_holdings(positions: pd.DataFrame, last_prices: pd.Series, fx_rate: float, company_names: dict) -> list:
     """Calculate current value and return for each position. All values in JPY."""
-    holdings = []
-
-    for _, pos in positions.iterrows():
-        ticker = pos["ticker"]
-        if ticker not in prices.columns:
-            print(f"  Skipping {ticker}: not in price data")
-            continue
-
-        ticker_prices = prices[ticker].dropna()
-        if len(ticker_prices) == 0:
-            print(f"  Skipping {ticker}: no price data available")
-            continue
-
-        current_price = ticker_prices.iloc[-1]
-        avg_cost = pos["avg_cost"]
-        shares = pos["shares"]
-        currency = pos["currency"]
-
-        # Calculate values in JPY (primary currency)
-        if currency == "JPY":
-            cost_jpy = avg_cost * shares
-            value_jpy = current_price * shares
-            display_cost = f"¥{avg_cost:,.0f}"
-            display_current = f"¥{current_price:,.0f}"
-        else:
-            # USD positions: convert to JPY
-            cost_jpy = avg_cost * shares * fx_rate
-            value_jpy = current_price * shares * fx_rate
-            display_cost = f"${avg_cost:,.2f}"
-            display_current = f"${current_price:,.2f}"
-
-        pct_return = ((current_price - avg_cost) / avg_cost) * 100
-
-        # Get company name from yfinance
-        try:
-            info = yf.Ticker(ticker).info
-            company_name = info.get("shortName", info.get("longName", ticker))
-        except Exception:
-            company_name = ticker
-
-        holdings.append({
-            "ticker": ticker,
-            "company_name": company_name,
-            "sector": pos["sector"],
-            "shares": int(shares),
-            "avg_cost": avg_cost,
-            "current_price": round(float(current_price), 2),
-            "display_cost": display_cost,
-            "display_current": display_current,
-            "currency": currency,
-            "cost_jpy": round(cost_jpy, 0),
-            "value_jpy": round(value_jpy, 0),
-            "return_pct": round(pct_return, 2),
-        })
+    in_prices = positions["ticker"].isin(last_prices.index)
+    for ticker in positions.loc[~in_prices, "ticker"]:
+        print(f"  Skipping {ticker}: not in price data")
+
+    holdings = positions[in_prices].copy()
+    holdings["current_price"] = last_prices.reindex(holdings["ticker"]).to_numpy()
+
+    no_data = holdings["current_price"].isna()
+    for ticker in holdings.loc[no_data, "ticker"]:
+        print(f"  Skipping {ticker}: no price data available")
+    holdings = holdings[~no_data]
+
+    holdings["company_name"] = [company_names.get(t, t) for t in holdings["ticker"]]
+
+    # Calculate values in JPY (primary currency); USD positions convert at fx_rate
+    is_jpy = holdings["currency"].eq("JPY").to_numpy()
+    fx = np.where(is_jpy, 1.0, fx_rate)
+    holdings["cost_jpy"] = (holdings["avg_cost"] * holdings["shares"] * fx).round(0)
+    holdings["value_jpy"] = (holdings["current_price"] * holdings["shares"] * fx).round(0)
+    holdings["return_pct"] = (
+        (holdings["current_price"] - holdings["avg_cost"]) / holdings["avg_cost"] * 100
+    ).round(2)
+
+    holdings["current_price"] = holdings["current_price"].round(2)
 
     # Sort by value descending
-    holdings.sort(key=lambda x: x["value_jpy"], reverse=True)
-    return holdings
+    holdings = holdings.sort_values("value_jpy", ascending=False, kind="stable")
+    return holdings[[
+        "ticker", "company_name", "sector", "shares", "avg_cost", "current_price",
+        "currency", "cost_jpy", "value_jpy", "return_pct",
+    ]].to_dict(orient="records")
 
 
 # ── Portfolio Analytics ────────────────────────────────────────
 
-def calculate_daily_nav(trades: pd.DataFrame, prices: pd.DataFrame, fx_rate_series: pd.Series) -> pd.Series:
+def _fx_asof(fx_rate_series: pd.Series, dates) -> np.ndarray:
+    """USD/JPY rate as of each date, falling back to 150.0 where unavailable."""
+    fx = fx_rate_series.ffill().reindex(dates, method="ffill")
+    return fx.where(fx > 0, 150.0).to_numpy()
+
+
+def calculate_daily_nav(trades: pd.DataFrame, prices: pd.DataFrame, fx_rate_series: pd.Series, since=None) -> pd.Series:
     """
-    Calculate daily portfolio NAV in JPY from inception.
+    Calculate daily portfolio NAV in JPY from inception, or only for
+    dates on or after `since` when given.
     Tracks cash + holdings value each day.
     """
-    tickers = trades["ticker"].unique()
     dates = prices.index
     inception = trades["date"].min()
-    dates = dates[dates >= pd.Timestamp(inception)]
-
-    nav_series = []
-
-    for date in dates:
-        cash_jpy = STARTING_CAPITAL
-        holdings_value = 0
-
-        # Process all trades up to this date
-        trades_to_date = trades[trades["date"] <= date]
-        position_shares = {}
-
-        for _, trade in trades_to_date.iterrows():
-            t = trade["ticker"]
-            if t not in position_shares:
-                position_shares[t] = 0
-
-            cost_in_native = trade["shares"] * trade["price"]
-
-            if trade["currency"] == "JPY":
-                cost_jpy_trade = cost_in_native
-            else:
-                # Convert USD cost to JPY at trade date
-                fx_at_trade = fx_rate_series.asof(trade["date"])
-                if pd.isna(fx_at_trade) or fx_at_trade <= 0:
-                    fx_at_trade = 150.0
-                cost_jpy_trade = cost_in_native * fx_at_trade
-
-            if trade["action"] == "BUY":
-                position_shares[t] = position_shares[t] + trade["shares"]
-                cash_jpy -= cost_jpy_trade
-            elif trade["action"] == "SELL":
-                position_shares[t] = position_shares[t] - trade["shares"]
-                cash_jpy += cost_jpy_trade
-
-        # Value holdings at current date's prices (all in JPY)
-        fx_today = fx_rate_series.asof(date)
-        if pd.isna(fx_today) or fx_today <= 0:
-            fx_today = 150.0
-
-        for t, shares in position_shares.items():
-            if shares <= 0 or t not in prices.columns:
-                continue
-            price_series = prices[t].dropna()
-            if len(price_series) == 0:
-                continue
-            price = price_series.asof(date)
-            if pd.isna(price):
-                continue
-
-            currency = trades[trades["ticker"] == t]["currency"].iloc[0]
-            if currency == "JPY":
-                holdings_value += price * shares
-            else:
-                holdings_value += price * shares * fx_today
-
-        total = cash_jpy + holdings_value
-        nav_series.append({"date": date, "nav": total})
-
-    nav_df = pd.DataFrame(nav_series).set_index("date")
-    return nav_df["nav"]
+    dates = dates[dates >= max(pd.Timestamp(inception), pd.Timestamp(since or inception))]
+
+    # Signed share and cash deltas per trade (BUY positive, SELL negative)
+    sign = np.select([trades["action"].eq("BUY"), trades["action"].eq("SELL")], [1, -1], 0)
+    fx_at_trade = _fx_asof(fx_rate_series, trades["date"])
+    cost_jpy_trade = trades["shares"] * trades["price"] * np.where(trades["currency"].eq("JPY"), 1.0, fx_at_trade)
+
+    # Each trade takes effect from the first price date on or after it
+    deltas = pd.DataFrame({
+        "row": dates.searchsorted(trades["date"]),
+        "ticker": trades["ticker"].to_numpy(),
+        "shares": trades["shares"].to_numpy() * sign,
+        "cash": -cost_jpy_trade.to_numpy() * sign,
+        "price": trades["price"].to_numpy(),
+    })
+    rows = pd.RangeIndex(len(dates))
+
+    shares = (
+        deltas.groupby(["row", "ticker"])["shares"].sum()
+        .unstack(fill_value=0)
+        .reindex(rows, fill_value=0)
+        .cumsum()
+    )
+    cash_jpy = STARTING_CAPITAL + deltas.groupby("row")["cash"].sum().reindex(rows, fill_value=0).cumsum()
+
+    # Value holdings at each date's prices (all in JPY)
+    held = [t for t in shares.columns if t in prices.columns]
+    currency = trades.groupby("ticker", observed=True)["currency"].first().to_dict()
+    prices_jpy = prices[held].loc[dates].astype(np.float64)
+
+    # Until a ticker's first quote, value it at its latest trade price so the
+    # purchase doesn't show up as a loss of its full cost
+    trade_prices = (
+        deltas.groupby(["row", "ticker"])["price"].last()
+        .unstack()
+        .reindex(index=rows, columns=held)
+        .ffill()
+    )
+    prices_jpy = prices_jpy.fillna(trade_prices.set_axis(dates))
+    usd_cols = [t for t in held if currency[t] != "JPY"]
+    prices_jpy[usd_cols] = prices_jpy[usd_cols].mul(_fx_asof(fx_rate_series, dates), axis=0)
+
+    holdings_value = (shares[held].clip(lower=0).to_numpy() * prices_jpy.fillna(0).to_numpy()).sum(axis=1)
+
+    nav = pd.Series(cash_jpy.to_numpy() + holdings_value, index=dates, name="nav", dtype=np.float64)
+    nav.index.name = "date"
+    return nav
+
+
+def trades_fingerprint(path: str) -> str:
+    """Hash the trades file and starting capital; any change invalidates the NAV cache."""
+    digest = hashlib.sha1(str(STARTING_CAPITAL).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def update_daily_nav(
+    trades: pd.DataFrame,
+    prices: pd.DataFrame,
+    fx_rate_series: pd.Series,
+    fingerprint: str,
+    cache_path: str = NAV_CACHE_PATH,
+    prices_refreshed: bool = False,
+) -> pd.Series:
+    """
+    Extend the cached daily NAV with new dates, recomputing fully when trades
+    change or the price history was downloaded again from scratch.
+    """
+    cached = None
+    if not prices_refreshed and os.path.exists(cache_path):
+        cache = pd.read_parquet(cache_path)
+        if not cache.empty and cache["trades_sha1"].eq(fingerprint).all():
+            cached = cache["nav"]
+
+    if cached is None:
+        nav = calculate_daily_nav(trades, prices, fx_rate_series)
+    else:
+        # Recompute the last cached date too, in case it was a partial session
+        since = cached.index.max()
+        print(f"  Using cached NAV through {since:%Y-%m-%d}")
+        nav = calculate_daily_nav(trades, prices, fx_rate_series, since=since)
+        nav = pd.concat([cached[cached.index < since], nav])
+
+    nav.to_frame().assign(trades_sha1=fingerprint).to_parquet(cache_path, compression="zstd")
+    return nav
 
 
 def calculate_metrics(nav: pd.Series) -> dict:
@@ -307,19 +466,22 @@ def calculate_metrics(nav: pd.Series) -> dict:
     else:
         ytd_return = total_return
 
-    # Daily returns for Sharpe
-    daily_returns = nav.pct_change().dropna()
+    # Daily returns for Sharpe (plain ndarrays, no intermediate Series).
+    # Subtracting the risk-free rate doesn't change the std, so apply it to the mean only.
+    values = nav.to_numpy(dtype=np.float64)
+    daily_returns = values[1:] / values[:-1] - 1
     if len(daily_returns) > 1:
-        excess_returns = daily_returns - (RISK_FREE_RATE / 252)
-        sharpe = (excess_returns.mean() / excess_returns.std()) * np.sqrt(252)
+        excess_mean = daily_returns.mean() - (RISK_FREE_RATE / 252)
+        sharpe = (excess_mean / daily_returns.std(ddof=1)) * np.sqrt(252)
     else:
         sharpe = 0
 
     # Max drawdown
-    cummax = nav.cummax()
-    drawdown = (nav - cummax) / cummax
-    max_drawdown = drawdown.min() * 100
-    max_dd_date = drawdown.idxmin()
+    cummax = np.maximum.accumulate(values)
+    drawdown = values / cummax - 1
+    max_dd_idx = drawdown.argmin()
+    max_drawdown = drawdown[max_dd_idx] * 100
+    max_dd_date = nav.index[max_dd_idx]
 
     return {
         "total_return": round(total_return, 2),
@@ -333,40 +495,39 @@ def calculate_metrics(nav: pd.Series) -> dict:
 
 def calculate_benchmark_returns(prices: pd.DataFrame, inception_date) -> dict:
     """Calculate benchmark cumulative return series."""
+    bench_tickers = {name: ticker for name, ticker in BENCHMARKS.items() if ticker in prices.columns}
+    bench = prices[list(bench_tickers.values())].astype(np.float64)
+    bench = bench[bench.index >= pd.Timestamp(inception_date)]
+    if bench.empty:
+        return {}
+
+    # First and last valid price per benchmark since inception
+    cumulative = ((bench.iloc[-1] / bench.bfill().iloc[0]) - 1) * 100
+
     benchmarks = {}
-    for name, ticker in BENCHMARKS.items():
-        if ticker in prices.columns:
-            series = prices[ticker].dropna()
-            series = series[series.index >= pd.Timestamp(inception_date)]
-            if len(series) > 0:
-                cumulative = ((series / series.iloc[0]) - 1) * 100
-                benchmarks[name] = {
-                    "current": round(cumulative.iloc[-1], 2),
-                }
+    for name, ticker in bench_tickers.items():
+        if not pd.isna(cumulative[ticker]):
+            benchmarks[name] = {
+                "current": round(cumulative[ticker], 2),
+            }
     return benchmarks
 
 
 def calculate_allocations(holdings: list, total_value: float) -> dict:
     """Calculate geography and sector breakdowns."""
-    geo = {}
-    sector = {}
-
-    for h in holdings:
-        weight = h["value_jpy"] / total_value if total_value > 0 else 0
-
-        # Geography
-        country = "Japan" if h["currency"] == "JPY" else "United States"
-        geo[country] = geo.get(country, 0) + weight
+    if not holdings:
+        return {"geography": {}, "sector": {}}
 
-        # Sector
-        s = h["sector"]
-        sector[s] = sector.get(s, 0) + weight
+    hf = pd.DataFrame(holdings)
+    hf["country"] = np.where(hf["currency"].eq("JPY"), "Japan", "United States")
+    hf["weight"] = hf["value_jpy"] / total_value * 100 if total_value > 0 else 0.0
 
-    # Sort descending
-    geo = {k: round(v * 100, 1) for k, v in sorted(geo.items(), key=lambda x: -x[1])}
-    sector = {k: round(v * 100, 1) for k, v in sorted(sector.items(), key=lambda x: -x[1])}
+    # Sort descending, keeping first-seen order for ties
+    def breakdown(key: str) -> dict:
+        weights = hf.groupby(key, sort=False)["weight"].sum()
+        return weights.sort_values(ascending=False, kind="stable").round(1).to_dict()
 
-    return {"geography": geo, "sector": sector}
+    return {"geography": breakdown("country"), "sector": breakdown("sector")}
 
 
 def build_chart_series(nav: pd.Series, prices: pd.DataFrame, inception_date) -> dict:
@@ -377,53 +538,74 @@ def build_chart_series(nav: pd.Series, prices: pd.DataFrame, inception_date) ->
 
     chart = {
         "dates": [d.strftime("%Y-%m-%d") for d in cumulative.index],
-        "portfolio": [round(v, 2) for v in cumulative.values],
+        "portfolio": np.round(cumulative.to_numpy(), 2),  # serialized by orjson as-is
     }
 
-    for name, ticker in BENCHMARKS.items():
-        if ticker in prices.columns:
-            bench = prices[ticker].dropna()
-            bench = bench[bench.index >= pd.Timestamp(inception_date)]
-            if len(bench) > 0:
-                bench_weekly = bench.resample("W").last()
-                # Align to same dates
-                bench_weekly = bench_weekly.reindex(nav_weekly.index, method="ffill")
-                bench_cum = ((bench_weekly / bench_weekly.iloc[0]) - 1) * 100
-                chart[name] = [round(v, 2) if not pd.isna(v) else 0 for v in bench_cum.values]
+    # Resample all benchmarks in one pass, aligned to the same dates
+    bench_tickers = {name: ticker for name, ticker in BENCHMARKS.items() if ticker in prices.columns}
+    bench = prices[list(bench_tickers.values())].astype(np.float64)
+    bench = bench[bench.index >= pd.Timestamp(inception_date)].dropna(axis=1, how="all")
+    if not bench.empty:
+        bench_weekly = bench.resample("W").last().reindex(nav_weekly.index, method="ffill")
+        bench_cum = (((bench_weekly / bench_weekly.bfill().iloc[0]) - 1) * 100).fillna(0.0).round(2)
+        for name, ticker in bench_tickers.items():
+            if ticker in bench_cum.columns:
+                chart[name] = bench_cum[ticker].to_numpy()
 
     return chart
 
 
 # ── Main Pipeline ──────────────────────────────────────────────
 
-def main():
+def run_portfolio(
+    trades_path: str,
+    output_path: str,
+    prices_cache_path: str = PRICES_CACHE_PATH,
+    nav_cache_path: str = NAV_CACHE_PATH,
+    names_path: str = NAMES_PATH,
+):
+    """
+    Run the full pipeline for one trades file and write its portfolio JSON.
+    Each portfolio needs its own price and NAV cache paths, otherwise runs for
+    different portfolios invalidate each other's caches.
+    """
     print("Loading trades...")
-    trades = load_trades(TRADES_PATH)
+    trades = load_trades(trades_path)
     inception_date = trades["date"].min().strftime("%Y-%m-%d")
     tickers = get_all_tickers(trades)
 
     print(f"Found {len(trades)} trades across {len(tickers)} tickers")
     print(f"Inception date: {inception_date}")
 
-    print("Fetching prices...")
-    prices = fetch_prices(tickers, start_date=inception_date)
-
-    print("Getting FX rate...")
-    fx_rate = get_fx_rate()
-    fx_series = prices[USD_JPY_TICKER] if USD_JPY_TICKER in prices.columns else pd.Series(fx_rate, index=prices.index)
-    print(f"USD/JPY: {fx_rate:.2f}")
-
     print("Building positions...")
     positions = build_positions(trades)
     print(f"Active positions: {len(positions)}")
 
+    # Both steps are network-bound and independent, so run them side by side
+    print("Fetching prices and company names...")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        prices_future = pool.submit(fetch_prices, tickers, inception_date, prices_cache_path)
+        names_future = pool.submit(fetch_company_names, positions["ticker"].tolist(), names_path)
+        prices, prices_refreshed = prices_future.result()
+        company_names = names_future.result()
+    last_prices = get_last_prices(prices)
+
+    print("Getting FX rate...")
+    # Use the USD/JPY close already downloaded; only hit the network if it's missing
+    fx_rate = last_prices.get(USD_JPY_TICKER, np.nan)
+    if pd.isna(fx_rate) or fx_rate <= 0:
+        fx_rate = get_fx_rate()
+    fx_rate = float(fx_rate)
+    fx_series = prices[USD_JPY_TICKER] if USD_JPY_TICKER in prices.columns else pd.Series(fx_rate, index=prices.index, dtype=np.float32)
+    print(f"USD/JPY: {fx_rate:.2f}")
+
     print("Calculating holdings...")
-    holdings = calculate_holdings(positions, prices, fx_rate)
+    holdings = calculate_holdings(positions, last_prices, fx_rate, company_names)
 
     total_invested_jpy = sum(h["value_jpy"] for h in holdings)
 
     print("Calculating daily NAV...")
-    nav = calculate_daily_nav(trades, prices, fx_series)
+    nav = update_daily_nav(trades, prices, fx_series, trades_fingerprint(trades_path), nav_cache_path, prices_refreshed)
     total_value_jpy = nav.iloc[-1]
 
     cash_jpy = total_value_jpy - total_invested_jpy
@@ -444,6 +626,8 @@ def main():
     for h in holdings:
         h["weight"] = round((h["value_jpy"] / total_value_jpy) * 100, 1) if total_value_jpy > 0 else 0
 
+    currency_counts = Counter(h["currency"] for h in holdings)
+
     # ── Assemble output ──
     output = {
         "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M"),
@@ -458,8 +642,8 @@ def main():
             "max_drawdown": metrics["max_drawdown"],
             "max_drawdown_date": metrics["max_drawdown_date"],
             "positions_count": len(holdings),
-            "jp_count": sum(1 for h in holdings if h["currency"] == "JPY"),
-            "us_count": sum(1 for h in holdings if h["currency"] == "USD"),
+            "jp_count": currency_counts.get("JPY", 0),
+            "us_count": currency_counts.get("USD", 0),
             "cash_jpy": round(cash_jpy, 0),
             "cash_pct": round(cash_pct, 1),
         },
@@ -470,11 +654,11 @@ def main():
     }
 
     # ── Write JSON ──
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    with open(OUTPUT_PATH, "w") as f:
-        json.dump(output, f, indent=2)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
-    print(f"\nPortfolio JSON written to {OUTPUT_PATH}")
+    print(f"\nPortfolio JSON written to {output_path}")
     print(f"Portfolio value: ¥{total_value_jpy:,.0f}")
     print(f"USD/JPY: {fx_rate:.2f}")
     print(f"Total return: {metrics['total_return']:+.2f}%")
@@ -482,5 +666,9 @@ def main():
     print(f"Max drawdown: {metrics['max_drawdown']:.2f}%")
 
 
+def main():
+    run_portfolio(TRADES_PATH, OUTPUT_PATH)
+
+
 if __name__ == "__main__":
     main()